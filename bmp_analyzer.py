@@ -3,12 +3,988 @@ from tkinter import filedialog, messagebox, scrolledtext
 from tkinter import ttk
 import struct
 import os
+import sys
 import io
 import random
 import json
+import math
+import time
+import hashlib
+import sqlite3
+import argparse
+import queue
+import tempfile
+import threading
+from collections import OrderedDict
 from typing import List, Tuple, Dict, Set
 from PIL import Image, ImageTk
 
+# Validation result codes returned by validate_bmp_header
+BMP_OK = 'ok'
+BMP_ERR_TRUNCATED_HEADER = 'truncated_header'
+BMP_ERR_BAD_SIGNATURE = 'bad_signature'
+BMP_ERR_FILE_SIZE = 'file_size_mismatch'
+BMP_ERR_DIB_SIZE = 'bad_dib_header_size'
+BMP_ERR_TRUNCATED_DIB = 'truncated_dib_header'
+BMP_ERR_DIMENSIONS = 'bad_dimensions'
+BMP_ERR_PLANES = 'bad_planes'
+BMP_ERR_BIT_DEPTH = 'bad_bit_depth'
+BMP_ERR_COMPRESSION = 'bad_compression'
+BMP_ERR_PALETTE = 'bad_palette'
+BMP_ERR_PIXEL_OFFSET = 'bad_pixel_offset'
+BMP_ERR_TRUNCATED_PIXELS = 'truncated_pixel_data'
+
+# Known DIB header sizes: CORE, INFO, V2, V3, OS/2 v2, V4, V5
+DIB_HEADER_SIZES = (12, 40, 52, 56, 64, 108, 124)
+VALID_BIT_DEPTHS = (1, 2, 4, 8, 16, 24, 32)
+# BI_RGB, BI_RLE8, BI_RLE4, BI_BITFIELDS, BI_JPEG, BI_PNG, BI_ALPHABITFIELDS
+VALID_COMPRESSIONS = (0, 1, 2, 3, 4, 5, 6)
+UNCOMPRESSED = (0, 3, 6)
+# Bit depths each compression method allows (RLE8, RLE4, BITFIELDS, ALPHABITFIELDS)
+COMPRESSION_BIT_DEPTHS = {1: (8,), 2: (4,), 3: (16, 32), 6: (16, 32)}
+
+# Pillow (mode, raw decoder mode) for each uncompressed bit depth
+PIXEL_RAW_MODES = {
+    1: ('P', 'P;1'),
+    2: ('P', 'P;2'),
+    4: ('P', 'P;4'),
+    8: ('P', 'P'),
+    16: ('RGB', 'BGR;15'),
+    24: ('RGB', 'BGR'),
+    32: ('RGB', 'BGRX'),
+}
+# Raw decoder mode for BITFIELDS (bit depth, red mask, green mask, blue mask); other masks are not decoded
+BITFIELDS_RAW_MODES = {
+    (16, 0x7C00, 0x03E0, 0x001F): 'BGR;15',
+    (16, 0xF800, 0x07E0, 0x001F): 'BGR;16',
+    (32, 0x00FF0000, 0x0000FF00, 0x000000FF): 'BGRX',
+    (32, 0x000000FF, 0x0000FF00, 0x00FF0000): 'RGBX',
+}
+
+DEFAULT_INDEX_PATH = 'bmp_index.sqlite'
+# Stored with every indexed result. Bump whenever validation, section parsing or scoring
+# changes so results from older analyzers are recomputed instead of served from the index.
+ANALYSIS_VERSION = 1
+
+
+def row_stride(width: int, bits_per_pixel: int) -> int:
+    """Bytes per pixel row, padded to a 4-byte boundary"""
+    return ((width * bits_per_pixel + 31) // 32) * 4
+
+
+def validate_bmp_header(data: bytes) -> Tuple[str, str]:
+    """Check every BMP header field against the buffer size.
+
+    Only the fixed-size headers are read, so the cost is constant no matter
+    how large or malformed the file is. Never raises; returns (code, message)
+    where code is BMP_OK or one of the BMP_ERR_* constants.
+    """
+    if data is None:
+        data = b''
+    file_size = len(data)
+    
+    if file_size < 18:
+        return BMP_ERR_TRUNCATED_HEADER, f"File is {file_size} bytes, too small for a BMP header"
+    
+    if data[0:2] != b'BM':
+        return BMP_ERR_BAD_SIGNATURE, f"Signature is {bytes(data[0:2])!r}, expected b'BM'"
+    
+    declared_size, _, pixel_data_offset, dib_header_size = struct.unpack('<IIII', data[2:18])
+    
+    # Some writers leave bfSize as 0; anything larger than the file means truncation
+    if declared_size > file_size:
+        return BMP_ERR_FILE_SIZE, f"Header declares {declared_size} bytes but file has {file_size}"
+    
+    if dib_header_size not in DIB_HEADER_SIZES:
+        return BMP_ERR_DIB_SIZE, f"Unknown DIB header size {dib_header_size}"
+    
+    dib_header_end = 14 + dib_header_size
+    if dib_header_end > file_size:
+        return BMP_ERR_TRUNCATED_DIB, f"DIB header ends at {dib_header_end}, past end of file ({file_size})"
+    
+    if dib_header_size == 12:
+        # BITMAPCOREHEADER: unsigned 16-bit dimensions, no compression
+        width, height, planes, bits_per_pixel = struct.unpack('<HHHH', data[18:26])
+        compression = 0
+        image_size = 0
+        colors_used = 0
+    else:
+        width, height, planes, bits_per_pixel, compression, image_size = struct.unpack('<iiHHII', data[18:38])
+        colors_used = struct.unpack('<I', data[46:50])[0]
+    
+    if width <= 0 or height == 0:
+        return BMP_ERR_DIMENSIONS, f"Invalid dimensions {width} x {height}"
+    
+    if planes != 1:
+        return BMP_ERR_PLANES, f"Color planes is {planes}, expected 1"
+    
+    if compression not in VALID_COMPRESSIONS:
+        return BMP_ERR_COMPRESSION, f"Unknown compression method {compression}"
+    
+    # JPEG/PNG payloads may declare a bit depth of 0
+    if bits_per_pixel not in VALID_BIT_DEPTHS and not (bits_per_pixel == 0 and compression in (4, 5)):
+        return BMP_ERR_BIT_DEPTH, f"Unsupported bit depth {bits_per_pixel}"
+    
+    if compression in COMPRESSION_BIT_DEPTHS and bits_per_pixel not in COMPRESSION_BIT_DEPTHS[compression]:
+        return BMP_ERR_BIT_DEPTH, f"Bit depth {bits_per_pixel} is not allowed with compression method {compression}"
+    
+    if 1 <= bits_per_pixel <= 8 and colors_used > (1 << bits_per_pixel):
+        return BMP_ERR_PALETTE, f"{colors_used} palette colors exceed {1 << bits_per_pixel} allowed at {bits_per_pixel} bpp"
+    
+    if pixel_data_offset < dib_header_end or pixel_data_offset > file_size:
+        return BMP_ERR_PIXEL_OFFSET, f"Pixel data offset {pixel_data_offset} outside {dib_header_end}..{file_size}"
+    
+    available = file_size - pixel_data_offset
+    if compression in UNCOMPRESSED:
+        pixel_data_size = abs(height) * row_stride(width, bits_per_pixel)
+    else:
+        pixel_data_size = image_size
+    
+    if pixel_data_size > available:
+        return BMP_ERR_TRUNCATED_PIXELS, f"Pixel data needs {pixel_data_size} bytes but only {available} remain"
+    
+    return BMP_OK, ""
+
+
+def parse_bmp_sections(data: bytes) -> List[Tuple[int, int, str]]:
+    """Parse BMP data and return list of (start, end, section_type) tuples"""
+    if not data or len(data) < 14:
+        return []
+    
+    sections = []
+    
+    # BMP Header (14 bytes)
+    bmp_header_size = 14
+    sections.append((0, bmp_header_size, 'header'))
+    
+    if len(data) < 18:
+        return sections
+    
+    # Get DIB header size (at offset 14)
+    dib_header_size = struct.unpack('<I', data[14:18])[0]
+    dib_header_end = 14 + dib_header_size
+    
+    if len(data) < dib_header_end:
+        # Header claims more bytes than the file holds; mark what exists
+        sections.append((14, len(data), 'dib_header'))
+        return sections
+    
+    sections.append((14, dib_header_end, 'dib_header'))
+    
+    # Get pixel data offset (at offset 10 in BMP header)
+    pixel_data_offset = struct.unpack('<I', data[10:14])[0]
+    
+    file_size = len(data)
+    pixel_data_offset = max(dib_header_end, min(pixel_data_offset, file_size))
+    
+    # Check if there's a color palette
+    # Color palette exists if pixel_data_offset > dib_header_end
+    if pixel_data_offset > dib_header_end:
+        palette_size = pixel_data_offset - dib_header_end
+        sections.append((dib_header_end, pixel_data_offset, 'color_palette'))
+    
+    # Pixel data extent comes from the DIB header
+    # Malformed headers skip straight to the fallback instead of computing nonsense ranges
+    geometry = read_pixel_geometry(data)
+    if geometry is not None:
+        pixel_data_end = geometry['pixel_end']
+        
+        # Pixel data
+        if pixel_data_offset < file_size:
+            sections.append((pixel_data_offset, pixel_data_end, 'pixel_data'))
+        
+        # Check for padding/extra data after pixel data
+        if pixel_data_end < file_size:
+            # Check if there's a recognizable end marker or just padding
+            remaining = data[pixel_data_end:]
+            if len(remaining) <= 4 and all(b == 0 for b in remaining):
+                sections.append((pixel_data_end, file_size, 'padding'))
+            else:
+                sections.append((pixel_data_end, file_size, 'end_marker'))
+    else:
+        # Fallback: treat everything after pixel_data_offset as pixel data
+        file_size = len(data)
+        if pixel_data_offset < file_size:
+            sections.append((pixel_data_offset, file_size, 'pixel_data'))
+    
+    return sections
+
+
+def read_pixel_geometry(data: bytes) -> Dict:
+    """Return the pixel section extent and dimensions from a valid header, or None.
+    
+    This is the single interpretation of the DIB header shared by section
+    parsing, embedding and pixel decoding.
+    """
+    code, _ = validate_bmp_header(data)
+    if code != BMP_OK:
+        return None
+    
+    pixel_data_offset, dib_header_size = struct.unpack('<II', data[10:18])
+    if dib_header_size == 12:
+        width, height, _, bits_per_pixel = struct.unpack('<HHHH', data[18:26])
+        compression = 0
+        image_size = 0
+    else:
+        width, height, _, bits_per_pixel, compression, image_size = struct.unpack('<iiHHII', data[18:38])
+    
+    row_size = row_stride(width, bits_per_pixel)
+    if compression in UNCOMPRESSED:
+        pixel_data_size = abs(height) * row_size
+    else:
+        pixel_data_size = image_size
+    
+    return {
+        'width': width,
+        'height': abs(height),
+        'bottom_up': height > 0,  # Positive height means rows are stored bottom to top
+        'bits_per_pixel': bits_per_pixel,
+        'compression': compression,
+        'dib_header_size': dib_header_size,
+        'row_size': row_size,
+        'pixel_start': pixel_data_offset,
+        'pixel_end': pixel_data_offset + pixel_data_size,
+    }
+
+
+def read_pixel_layout(data: bytes) -> Dict:
+    """Return the pixel geometry plus Pillow decoder modes, or None if the pixels cannot be decoded"""
+    layout = read_pixel_geometry(data)
+    if layout is None:
+        return None
+    
+    bits_per_pixel = layout['bits_per_pixel']
+    compression = layout['compression']
+    if compression not in UNCOMPRESSED or bits_per_pixel not in VALID_BIT_DEPTHS:
+        return None
+    
+    mode, raw_mode = PIXEL_RAW_MODES[bits_per_pixel]
+    if compression in (3, 6):
+        # Masks follow the 40-byte header, or sit inside it for V2 and later headers
+        if layout['dib_header_size'] == 40 and layout['pixel_start'] < 66:
+            return None
+        masks = (bits_per_pixel,) + struct.unpack('<III', data[54:66])
+        if masks not in BITFIELDS_RAW_MODES:
+            return None
+        raw_mode = BITFIELDS_RAW_MODES[masks]
+    
+    layout['mode'] = mode
+    layout['raw_mode'] = raw_mode
+    return layout
+
+
+def pixel_data_range(data: bytes) -> Tuple[int, int]:
+    """Get the start and end positions of pixel data section"""
+    geometry = read_pixel_geometry(data)
+    if geometry is None:
+        return None, None
+    
+    return geometry['pixel_start'], geometry['pixel_end']
+
+
+def embed_payload(data: bytes, payload: bytes) -> Tuple[bytes, List[int]]:
+    """Write payload bytes to random pixel data positions.
+    
+    Returns the modified data and the positions in payload order, which is
+    what an ADR file stores. Raises ValueError if the payload does not fit.
+    """
+    pixel_start, pixel_end = pixel_data_range(data)
+    if pixel_start is None or pixel_end is None:
+        code, message = validate_bmp_header(data)
+        raise ValueError(f"Could not determine pixel data range.\n{code}: {message}")
+    
+    pixel_data_size = pixel_end - pixel_start
+    if pixel_data_size < len(payload):
+        raise ValueError(f"String is too long ({len(payload)} bytes). "
+                         f"Pixel data only has {pixel_data_size} bytes available.")
+    
+    # Convert data to bytearray for modification
+    data_array = bytearray(data)
+    
+    # Generate random positions within pixel data
+    available_positions = list(range(pixel_start, pixel_end))
+    random.shuffle(available_positions)
+    
+    # Store positions and replace bytes in order (preserve character order)
+    positions = []
+    for i, byte_val in enumerate(payload):
+        pos = available_positions[i]
+        positions.append(pos)  # Keep in order, don't sort
+        data_array[pos] = byte_val
+    
+    return bytes(data_array), positions
+
+
+def extract_payload(data: bytes, positions: List[int]) -> Tuple[bytes, List[int]]:
+    """Read bytes at positions in order; returns (payload, positions that were out of range)"""
+    extracted_bytes = []
+    out_of_range = []
+    for pos in positions:
+        if 0 <= pos < len(data):
+            extracted_bytes.append(data[pos])
+        else:
+            out_of_range.append(pos)
+    return bytes(extracted_bytes), out_of_range
+
+
+def byte_histogram(chunk: bytes) -> List[int]:
+    """Count byte values with Pillow's C histogram instead of a Python loop"""
+    if not chunk:
+        return [0] * 256
+    return Image.frombytes('L', (len(chunk), 1), bytes(chunk)).histogram()
+
+
+def shannon_entropy(histogram: List[int]) -> float:
+    """Shannon entropy in bits per byte (0.0 to 8.0) of a 256-bin histogram"""
+    total = sum(histogram)
+    if not total:
+        return 0.0
+    
+    entropy = 0.0
+    for count in histogram:
+        if count:
+            p = count / total
+            entropy -= p * math.log2(p)
+    return entropy
+
+
+class BlockStatistics:
+    """Byte histograms and entropy cached per fixed-size block of the file.
+    
+    Edits only mark the blocks they touch as dirty, so update() rescans those
+    blocks and adjusts the running totals instead of the whole file.
+    """
+    
+    MIN_BLOCK_SIZE = 1024
+    MAX_BLOCKS = 4096
+    ANOMALY_BITS = 1.5  # Entropy deviation from the section median that gets flagged
+    
+    def __init__(self):
+        self.reset()
+    
+    def reset(self):
+        """Forget all cached blocks; the next update() rescans the whole file"""
+        self.data_size = None
+        self.layout = None
+        self.block_size = self.MIN_BLOCK_SIZE
+        self.histograms = []
+        self.entropies = []
+        self.channel_histograms = []
+        self.total_histogram = [0] * 256
+        self.channel_names = []
+        self.channel_totals = []
+        self.dirty = None  # None means every block is dirty
+    
+    def mark_dirty(self, positions):
+        """Record edited byte positions so only their blocks are recomputed"""
+        if self.dirty is None:
+            return
+        for pos in positions:
+            self.dirty.add(pos // self.block_size)
+            # A pixel belongs to the block holding its first byte, up to 3 bytes earlier
+            self.dirty.add(max(0, pos - 3) // self.block_size)
+    
+    @property
+    def block_count(self) -> int:
+        return len(self.histograms)
+    
+    def update(self, data: bytes, layout: Dict) -> int:
+        """Recompute dirty blocks and return how many were rescanned"""
+        # Header edits that change the pixel layout also change channel assignment
+        if self.data_size != len(data) or self.dirty is None or layout != self.layout:
+            self.start_full_scan(data, layout)
+        
+        dirty = sorted(self.dirty)
+        for block in dirty:
+            self.scan_block(data, layout, block)
+        self.dirty = set()
+        return len(dirty)
+    
+    def start_full_scan(self, data: bytes, layout: Dict):
+        self.reset()
+        self.data_size = len(data)
+        self.layout = layout
+        
+        # Grow the block size so very large files stay within MAX_BLOCKS
+        while self.data_size > self.block_size * self.MAX_BLOCKS:
+            self.block_size *= 2
+        count = (self.data_size + self.block_size - 1) // self.block_size
+        
+        if layout is not None and layout['bits_per_pixel'] in (24, 32):
+            if layout['raw_mode'].startswith('RGB'):
+                self.channel_names = ['Red', 'Green', 'Blue', 'Alpha'][:layout['bits_per_pixel'] // 8]
+            else:
+                self.channel_names = ['Blue', 'Green', 'Red', 'Alpha'][:layout['bits_per_pixel'] // 8]
+        self.channel_totals = [[0] * 256 for _ in self.channel_names]
+        
+        self.histograms = [[0] * 256 for _ in range(count)]
+        self.entropies = [0.0] * count
+        self.channel_histograms = [[[0] * 256 for _ in self.channel_names] for _ in range(count)]
+        self.dirty = set(range(count))
+    
+    def scan_block(self, data: bytes, layout: Dict, block: int):
+        start = block * self.block_size
+        end = min(start + self.block_size, self.data_size)
+        
+        histogram = byte_histogram(data[start:end])
+        old = self.histograms[block]
+        self.total_histogram = [t - o + n for t, o, n in zip(self.total_histogram, old, histogram)]
+        self.histograms[block] = histogram
+        self.entropies[block] = shannon_entropy(histogram)
+        
+        if not self.channel_names:
+            return
+        
+        channels = self.channel_bytes(data, layout, start, end)
+        for c, channel_data in enumerate(channels):
+            histogram = byte_histogram(channel_data)
+            old = self.channel_histograms[block][c]
+            self.channel_totals[c] = [t - o + n for t, o, n in zip(self.channel_totals[c], old, histogram)]
+            self.channel_histograms[block][c] = histogram
+    
+    def channel_bytes(self, data: bytes, layout: Dict, start: int, end: int) -> List[bytes]:
+        """Split the pixel bytes in [start, end) into per-channel byte strings, skipping row padding"""
+        bytes_per_pixel = layout['bits_per_pixel'] // 8
+        row_size = layout['row_size']
+        pixel_start = layout['pixel_start']
+        start = max(start, pixel_start)
+        end = min(end, layout['pixel_end'], self.data_size)
+        
+        channels = [[] for _ in range(bytes_per_pixel)]
+        if start >= end:
+            return [b''] * bytes_per_pixel
+        
+        row = (start - pixel_start) // row_size
+        while True:
+            row_start = pixel_start + row * row_size
+            if row_start >= end:
+                break
+            
+            # Pixels belong to the block holding their first byte; row padding is excluded
+            pixels_start = row_start + max(0, start - row_start + bytes_per_pixel - 1) // bytes_per_pixel * bytes_per_pixel
+            pixels_end = row_start + (end - row_start + bytes_per_pixel - 1) // bytes_per_pixel * bytes_per_pixel
+            pixels_end = min(pixels_end, row_start + layout['width'] * bytes_per_pixel, layout['pixel_end'])
+            if pixels_start < pixels_end:
+                segment = data[pixels_start:pixels_end]
+                for c in range(bytes_per_pixel):
+                    channels[c].append(segment[c::bytes_per_pixel])
+            row += 1
+        
+        return [b''.join(parts) for parts in channels]
+    
+    def anomalous_blocks(self, sections: List[Tuple[int, int, str]]) -> List[int]:
+        """Blocks whose entropy is far from the median of the section they start in"""
+        anomalies = []
+        for section_start, section_end, _ in sections:
+            first = (section_start + self.block_size - 1) // self.block_size
+            last = min((section_end - 1) // self.block_size, self.block_count - 1)
+            if first > last:
+                continue
+            
+            values = sorted(self.entropies[first:last + 1])
+            median = values[len(values) // 2]
+            for block in range(first, last + 1):
+                if abs(self.entropies[block] - median) > self.ANOMALY_BITS:
+                    anomalies.append(block)
+        return anomalies
+
+
+class ContentIndex:
+    """Persistent SQLite index of analysis results keyed by content hash.
+    
+    The files table remembers (size, mtime) per path so unchanged files are
+    recognized without reading them; only changed or new paths are hashed,
+    and identical content under any path reuses the stored result. Results
+    written by a different ANALYSIS_VERSION are treated as missing.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS results (
+                digest TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                validation_code TEXT NOT NULL,
+                validation_message TEXT NOT NULL,
+                sections TEXT NOT NULL,
+                entropy REAL,
+                anomalous_blocks INTEGER,
+                analyzed_at REAL NOT NULL,
+                analysis_version INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                digest TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS files_digest ON files (digest);
+        """)
+        
+        # Indexes created before versioning lack the column; their rows read as version 0
+        columns = [row[1] for row in self.connection.execute("PRAGMA table_info(results)")]
+        if 'analysis_version' not in columns:
+            with self.connection:
+                self.connection.execute(
+                    "ALTER TABLE results ADD COLUMN analysis_version INTEGER NOT NULL DEFAULT 0"
+                )
+    
+    def close(self):
+        self.connection.close()
+    
+    @staticmethod
+    def content_digest(data: bytes) -> str:
+        """SHA-256 of the file contents.
+        
+        The bytes are already in memory for analysis, so the buffer is hashed
+        directly instead of re-reading the file in chunks.
+        """
+        return hashlib.sha256(data).hexdigest()
+    
+    def get_result(self, digest: str) -> Dict:
+        row = self.connection.execute(
+            "SELECT validation_code, validation_message, sections, entropy, anomalous_blocks, size "
+            "FROM results WHERE digest = ? AND analysis_version = ?", (digest, ANALYSIS_VERSION)
+        ).fetchone()
+        if row is None:
+            return None
+        
+        return {
+            'validation': row[0],
+            'message': row[1],
+            'sections': [tuple(section) for section in json.loads(row[2])],
+            'entropy': row[3],
+            'anomalous_blocks': row[4],
+            'size': row[5],
+        }
+    
+    def lookup_unchanged(self, file_path: str, stat: os.stat_result) -> Tuple[str, Dict]:
+        """Return (digest, result) using only stat; both are None if the file changed"""
+        row = self.connection.execute(
+            "SELECT size, mtime_ns, digest FROM files WHERE path = ?", (os.path.abspath(file_path),)
+        ).fetchone()
+        
+        # Same size and mtime as last time: trust the stored digest without reading the file
+        if row is not None and row[0] == stat.st_size and row[1] == stat.st_mtime_ns:
+            result = self.get_result(row[2])
+            if result is not None:
+                return row[2], result
+        
+        return None, None
+    
+    def remember_file(self, file_path: str, stat, digest: str):
+        file_path = os.path.abspath(file_path)
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO files (path, size, mtime_ns, digest) VALUES (?, ?, ?, ?)",
+                (file_path, stat.st_size, stat.st_mtime_ns, digest)
+            )
+    
+    def store(self, digest: str, result: Dict):
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO results (digest, size, validation_code, validation_message, "
+                "sections, entropy, anomalous_blocks, analyzed_at, analysis_version) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (digest, result['size'], result['validation'], result['message'],
+                 json.dumps(result['sections']), result['entropy'], result['anomalous_blocks'], time.time(),
+                 ANALYSIS_VERSION)
+            )
+    
+    def prune(self) -> Tuple[int, int]:
+        """Drop entries for deleted files, results no file refers to and results from older analyzers"""
+        missing = [(path,) for (path,) in self.connection.execute("SELECT path FROM files")
+                   if not os.path.exists(path)]
+        with self.connection:
+            self.connection.executemany("DELETE FROM files WHERE path = ?", missing)
+            orphaned = self.connection.execute(
+                "DELETE FROM results WHERE digest NOT IN (SELECT digest FROM files) OR analysis_version != ?",
+                (ANALYSIS_VERSION,)
+            ).rowcount
+        return len(missing), orphaned
+    
+    def compact(self):
+        """Reclaim space left by pruned rows"""
+        self.connection.execute("VACUUM")
+
+
+def analyze_bmp_data(data: bytes) -> Dict:
+    """Validate, parse and score BMP data without any GUI"""
+    code, message = validate_bmp_header(data)
+    sections = parse_bmp_sections(data)
+    
+    # Fast-fail: malformed files are reported without scanning their contents
+    if code != BMP_OK:
+        return {
+            'validation': code,
+            'message': message,
+            'sections': sections,
+            'entropy': None,
+            'anomalous_blocks': None,
+            'size': len(data),
+        }
+    
+    stats = BlockStatistics()
+    stats.update(data, read_pixel_layout(data))
+    
+    return {
+        'validation': code,
+        'message': message,
+        'sections': sections,
+        'entropy': shannon_entropy(stats.total_histogram),
+        'anomalous_blocks': len(stats.anomalous_blocks(sections)),
+        'size': len(data),
+    }
+
+
+def process_file(file_path: str, index: ContentIndex, data: bytes = None,
+                 stat: os.stat_result = None) -> Dict:
+    """Analyze one file, reusing the indexed result when the content was seen before.
+    
+    A changed or new file is read once; the same bytes are hashed and, on an
+    index miss, analyzed. A caller that already read the file passes data
+    together with the stat it took before reading.
+    """
+    if data is not None and stat is None:
+        raise ValueError("stat taken before reading data is required")
+    if stat is None:
+        stat = os.stat(file_path)
+    
+    digest, result = index.lookup_unchanged(file_path, stat)
+    if result is not None:
+        result['status'] = 'cached'
+    else:
+        if data is None:
+            with open(file_path, 'rb') as f:
+                data = f.read()
+        digest = index.content_digest(data)
+        result = index.get_result(digest)
+        if result is not None:
+            result['status'] = 'deduplicated'
+        else:
+            result = analyze_bmp_data(data)
+            index.store(digest, result)
+            result['status'] = 'analyzed'
+        
+        # Only record (size, mtime) for this digest if the file did not change while it was read;
+        # otherwise later scans would trust a digest of older content
+        current = os.stat(file_path)
+        if (current.st_size, current.st_mtime_ns) == (stat.st_size, stat.st_mtime_ns):
+            index.remember_file(file_path, stat, digest)
+    
+    result['path'] = file_path
+    result['digest'] = digest
+    return result
+
+
+def find_bmp_files(paths: List[str]) -> List[str]:
+    """Expand directories into the .bmp files they contain"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for directory, _, names in os.walk(path):
+                for name in sorted(names):
+                    if name.lower().endswith('.bmp'):
+                        files.append(os.path.join(directory, name))
+        else:
+            files.append(path)
+    return files
+
+
+def default_file_mode() -> int:
+    """Permissions open() would give a new file under the current umask"""
+    # os.umask can only be read by setting it, so do this once before worker threads start
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+DEFAULT_FILE_MODE = default_file_mode()
+
+
+def atomic_write(path: str, content: bytes):
+    """Write to a temporary file in the same directory, then rename over the target"""
+    directory = os.path.dirname(path) or "."
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp creates files as 0600; give the result the permissions a normal write would
+        os.chmod(temp_path, DEFAULT_FILE_MODE)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+class PipelineMetrics:
+    """Thread-safe queue depth and per-stage latency counters for the spool watcher"""
+    
+    def __init__(self, work_queue: queue.Queue):
+        self.work_queue = work_queue
+        self.lock = threading.Lock()
+        self.stages = {}  # stage -> {'count', 'total', 'max', 'last'}
+        self.counters = {'enqueued': 0, 'completed': 0, 'failed': 0, 'backpressure': 0}
+    
+    def record(self, stage: str, seconds: float):
+        with self.lock:
+            stats = self.stages.setdefault(stage, {'count': 0, 'total': 0.0, 'max': 0.0, 'last': 0.0})
+            stats['count'] += 1
+            stats['total'] += seconds
+            stats['max'] = max(stats['max'], seconds)
+            stats['last'] = seconds
+    
+    def increment(self, counter: str):
+        with self.lock:
+            self.counters[counter] += 1
+    
+    def snapshot(self) -> Dict:
+        with self.lock:
+            stages = {
+                stage: {
+                    'count': stats['count'],
+                    'mean_ms': 1000 * stats['total'] / stats['count'],
+                    'max_ms': 1000 * stats['max'],
+                    'last_ms': 1000 * stats['last'],
+                }
+                for stage, stats in self.stages.items()
+            }
+            return {
+                'queue_depth': self.work_queue.qsize(),
+                'queue_capacity': self.work_queue.maxsize,
+                'counters': dict(self.counters),
+                'stages': stages,
+            }
+
+
+class SpoolWatcher:
+    """Headless ingestion of BMP files dropped into a spool directory.
+    
+    The directory is polled; a file is only queued once its size and mtime
+    have stayed the same for settle_time seconds, so partially written files
+    are skipped. Work goes through a bounded queue to a pool of worker
+    threads. When the queue is full the poller stops enqueueing and retries
+    on the next poll instead of buffering without limit.
+    """
+    
+    def __init__(self, spool_dir: str, output_dir: str, workers: int = 4, queue_size: int = 16,
+                 poll_interval: float = 1.0, settle_time: float = 2.0, payload: bytes = None,
+                 adr_positions: List[int] = None, index_path: str = None):
+        # A queue size of 0 would make queue.Queue unbounded and disable backpressure
+        if workers < 1 or queue_size < 1:
+            raise ValueError("workers and queue_size must be at least 1")
+        
+        self.spool_dir = spool_dir
+        self.output_dir = output_dir
+        # Per-file outputs keep the full spool file name so a.bmp, a.BMP and metrics.bmp cannot collide
+        self.results_dir = os.path.join(output_dir, 'results')
+        self.worker_count = workers
+        self.poll_interval = poll_interval
+        self.settle_time = settle_time
+        self.payload = payload
+        self.adr_positions = adr_positions
+        self.index_path = index_path
+        
+        self.work_queue = queue.Queue(maxsize=queue_size)
+        self.metrics = PipelineMetrics(self.work_queue)
+        self.stop_event = threading.Event()
+        self.workers = []
+        self.pending = {}  # path -> ((size, mtime_ns), first time that signature was seen)
+        self.done = {}     # path -> (size, mtime_ns) last queued, so unchanged files are not redone
+    
+    def start(self):
+        os.makedirs(self.results_dir, exist_ok=True)
+        for i in range(self.worker_count):
+            worker = threading.Thread(target=self.worker_loop, name=f"bmp-worker-{i}", daemon=True)
+            worker.start()
+            self.workers.append(worker)
+    
+    def stop(self):
+        """Let workers finish queued files, then shut them down"""
+        self.stop_event.set()
+        for worker in self.workers:
+            # A dead worker never frees a slot, so only wait for room while one is still running
+            while worker.is_alive():
+                try:
+                    self.work_queue.put(None, timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+        for worker in self.workers:
+            worker.join()
+        self.workers = []
+    
+    def poll(self) -> int:
+        """Scan the spool once and enqueue files that have settled; returns how many were queued"""
+        now = time.monotonic()
+        seen = set()
+        queued = 0
+        queue_full = False
+        
+        with os.scandir(self.spool_dir) as entries:
+            for entry in entries:
+                # Files are renamed or removed from the spool at any time; skip those that vanished
+                try:
+                    if not entry.is_file() or not entry.name.lower().endswith('.bmp'):
+                        continue
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                
+                signature = (stat.st_size, stat.st_mtime_ns)
+                seen.add(entry.path)
+                if self.done.get(entry.path) == signature:
+                    continue
+                
+                # Restart the settle timer whenever the file is still growing or being touched
+                previous = self.pending.get(entry.path)
+                if previous is None or previous[0] != signature:
+                    self.pending[entry.path] = (signature, now)
+                    continue
+                if now - previous[1] < self.settle_time or queue_full:
+                    continue
+                
+                try:
+                    self.work_queue.put_nowait(entry.path)
+                except queue.Full:
+                    # Backpressure: leave settled files pending until workers catch up, but keep
+                    # scanning so every file stays in seen and other settle timers keep running
+                    self.metrics.increment('backpressure')
+                    queue_full = True
+                    continue
+                
+                del self.pending[entry.path]
+                self.done[entry.path] = signature
+                self.metrics.increment('enqueued')
+                queued += 1
+        
+        # Forget files removed from the spool so they are processed again if re-added
+        for path in list(self.pending):
+            if path not in seen:
+                del self.pending[path]
+        for path in list(self.done):
+            if path not in seen:
+                del self.done[path]
+        
+        return queued
+    
+    def run(self, once: bool = False, metrics_interval: float = 10.0):
+        """Poll until interrupted, or with once=True until the spool is drained"""
+        self.start()
+        last_report = time.monotonic()
+        try:
+            while not self.stop_event.is_set():
+                self.poll()
+                
+                if time.monotonic() - last_report >= metrics_interval:
+                    self.report_metrics()
+                    last_report = time.monotonic()
+                
+                if once and not self.pending and self.work_queue.unfinished_tasks == 0:
+                    break
+                if not any(worker.is_alive() for worker in self.workers):
+                    print("All workers have stopped; exiting", file=sys.stderr)
+                    break
+                time.sleep(self.poll_interval)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+            self.report_metrics()
+    
+    def report_metrics(self):
+        snapshot = self.metrics.snapshot()
+        atomic_write(os.path.join(self.output_dir, 'metrics.json'), json.dumps(snapshot, indent=2).encode('utf-8'))
+        stages = ', '.join(f"{stage} {stats['mean_ms']:.1f}ms" for stage, stats in snapshot['stages'].items())
+        print(f"Queue {snapshot['queue_depth']}/{snapshot['queue_capacity']} | {snapshot['counters']} | {stages}",
+              file=sys.stderr)
+    
+    def worker_loop(self):
+        index = None
+        index_error = None
+        try:
+            # SQLite connections cannot be shared across threads, so each worker opens its own.
+            # If that fails the worker keeps draining the queue, recording every file as failed.
+            if self.index_path:
+                try:
+                    index = ContentIndex(self.index_path)
+                except (sqlite3.Error, OSError) as e:
+                    index_error = e
+            
+            while True:
+                file_path = self.work_queue.get()
+                try:
+                    if file_path is None:
+                        return
+                    if index_error is not None:
+                        raise RuntimeError(f"Cannot open index {self.index_path}: {index_error}")
+                    self.process(file_path, index)
+                    self.metrics.increment('completed')
+                except Exception as e:
+                    self.metrics.increment('failed')
+                    try:
+                        self.write_result(file_path, {'path': file_path, 'status': 'error', 'message': str(e)})
+                    except OSError as write_error:
+                        print(f"Cannot write result for {file_path}: {write_error}", file=sys.stderr)
+                finally:
+                    self.work_queue.task_done()
+        finally:
+            if index is not None:
+                index.close()
+    
+    def timed(self, stage: str, function, *args):
+        started = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            self.metrics.record(stage, time.perf_counter() - started)
+    
+    def process(self, file_path: str, index: ContentIndex):
+        """Parse and validate one file, then embed or extract if configured"""
+        started = time.perf_counter()
+        file_name = os.path.basename(file_path)
+        
+        # With an index, unchanged content is answered without reading the file
+        data = None
+        stat = None
+        if index is None or self.payload is not None or self.adr_positions is not None:
+            stat = os.stat(file_path)
+            with open(file_path, 'rb') as f:
+                data = f.read()
+        
+        if index is not None:
+            result = self.timed('analyze', process_file, file_path, index, data, stat)
+        else:
+            result = self.timed('analyze', analyze_bmp_data, data)
+            result['path'] = file_path
+            result['status'] = 'analyzed'
+        result.pop('sections', None)
+        
+        if result['validation'] == BMP_OK and self.payload is not None:
+            embedded_data, positions = self.timed('embed', embed_payload, data, self.payload)
+            adr_data = {'positions': positions, 'count': len(positions)}
+            atomic_write(os.path.join(self.results_dir, file_name), embedded_data)
+            atomic_write(os.path.join(self.results_dir, f"{file_name}.adr"),
+                         json.dumps(adr_data, indent=2).encode('utf-8'))
+            result['embedded_bytes'] = len(positions)
+        
+        if result['validation'] == BMP_OK and self.adr_positions is not None:
+            extracted_bytes, out_of_range = self.timed('extract', extract_payload, data, self.adr_positions)
+            result['extracted'] = extracted_bytes.decode('utf-8', errors='replace')
+            result['out_of_range_positions'] = len(out_of_range)
+        
+        self.write_result(file_path, result)
+        self.metrics.record('total', time.perf_counter() - started)
+    
+    def write_result(self, file_path: str, result: Dict):
+        file_name = os.path.basename(file_path)
+        atomic_write(os.path.join(self.results_dir, f"{file_name}.json"), json.dumps(result, indent=2).encode('utf-8'))
+
+
 class BMPAnalyzer:
     def __init__(self, root):
         self.root = root
@@ -22,6 +998,9 @@ class BMPAnalyzer:
         self.display_img_width = 0
         self.display_img_height = 0
         self.replaced_byte_positions = []  # List of positions where bytes were replaced
+        self.pixel_inspector = None
+        self.statistics_panel = None
+        self.block_stats = BlockStatistics()
         
         # Color scheme for different sections
         self.colors = {
@@ -57,6 +1036,8 @@ class BMPAnalyzer:
         ttk.Button(file_frame, text="Load BMP File", command=self.load_bmp).pack(fill=tk.X, pady=2)
         ttk.Button(file_frame, text="Preview Binary Data", command=self.preview_binary_data).pack(fill=tk.X, pady=2)
         ttk.Button(file_frame, text="Export Binary to Image", command=self.export_binary).pack(fill=tk.X, pady=2)
+        ttk.Button(file_frame, text="Open Pixel Inspector", command=self.open_pixel_inspector).pack(fill=tk.X, pady=2)
+        ttk.Button(file_frame, text="Open Statistics", command=self.open_statistics_panel).pack(fill=tk.X, pady=2)
         
         # File info
         self.info_label = ttk.Label(file_frame, text="No file loaded", wraplength=200)
@@ -189,7 +1170,20 @@ class BMPAnalyzer:
             filename = os.path.basename(file_path)
             self.info_label.config(text=f"File: {filename}\nSize: {len(self.binary_data)} bytes")
             self.replaced_byte_positions = []  # Reset replaced positions
+            self.block_stats.reset()
+            
+            # Validate headers before any heavy work
+            code, message = validate_bmp_header(self.binary_data)
+            
             self.analyze_and_display()
+            
+            if code != BMP_OK:
+                self.preview_canvas.delete("all")
+                self.preview_info_label.config(text=f"Invalid BMP ({code}): {message}")
+                self.preview_photo = None
+                self.status_label.config(text=f"Loaded: {len(self.binary_data)} bytes | Validation failed: {code}")
+                return
+            
             self.update_preview()
             self.status_label.config(text=f"Loaded: {len(self.binary_data)} bytes")
             
@@ -198,68 +1192,7 @@ class BMPAnalyzer:
     
     def parse_bmp_structure(self) -> List[Tuple[int, int, str]]:
         """Parse BMP file and return list of (start, end, section_type) tuples"""
-        if not self.binary_data or len(self.binary_data) < 14:
-            return []
-        
-        sections = []
-        
-        # BMP Header (14 bytes)
-        bmp_header_size = 14
-        sections.append((0, bmp_header_size, 'header'))
-        
-        if len(self.binary_data) < bmp_header_size:
-            return sections
-        
-        # Get DIB header size (at offset 14)
-        dib_header_size = struct.unpack('<I', self.binary_data[14:18])[0]
-        dib_header_end = 14 + dib_header_size
-        sections.append((14, dib_header_end, 'dib_header'))
-        
-        if len(self.binary_data) < dib_header_end:
-            return sections
-        
-        # Get pixel data offset (at offset 10 in BMP header)
-        pixel_data_offset = struct.unpack('<I', self.binary_data[10:14])[0]
-        
-        # Check if there's a color palette
-        # Color palette exists if pixel_data_offset > dib_header_end
-        if pixel_data_offset > dib_header_end:
-            palette_size = pixel_data_offset - dib_header_end
-            sections.append((dib_header_end, pixel_data_offset, 'color_palette'))
-        
-        # Get image dimensions from DIB header to calculate row padding
-        # For BITMAPINFOHEADER (40 bytes), width and height are at offsets 4 and 8
-        if dib_header_size >= 40:
-            width = struct.unpack('<i', self.binary_data[18:22])[0]
-            height = struct.unpack('<i', self.binary_data[22:26])[0]
-            bits_per_pixel = struct.unpack('<H', self.binary_data[28:30])[0]
-            
-            # Calculate row size (with padding to 4-byte boundary)
-            row_size = ((width * bits_per_pixel + 31) // 32) * 4
-            pixel_data_size = abs(height) * row_size
-            
-            file_size = len(self.binary_data)
-            pixel_data_end = min(pixel_data_offset + pixel_data_size, file_size)
-            
-            # Pixel data
-            if pixel_data_offset < file_size:
-                sections.append((pixel_data_offset, pixel_data_end, 'pixel_data'))
-            
-            # Check for padding/extra data after pixel data
-            if pixel_data_end < file_size:
-                # Check if there's a recognizable end marker or just padding
-                remaining = self.binary_data[pixel_data_end:]
-                if len(remaining) <= 4 and all(b == 0 for b in remaining):
-                    sections.append((pixel_data_end, file_size, 'padding'))
-                else:
-                    sections.append((pixel_data_end, file_size, 'end_marker'))
-        else:
-            # Fallback: treat everything after pixel_data_offset as pixel data
-            file_size = len(self.binary_data)
-            if pixel_data_offset < file_size:
-                sections.append((pixel_data_offset, file_size, 'pixel_data'))
-        
-        return sections
+        return parse_bmp_sections(self.binary_data)
     
     def format_binary_data(self, data: bytes) -> str:
         """Format binary data as hex string with addresses"""
@@ -325,6 +1258,48 @@ class BMPAnalyzer:
                     tag_name = f"replaced_{byte_pos}"
                     self.text_widget.tag_add(tag_name, f"{line_num}.{col_start}", f"{line_num}.{col_end}")
                     self.text_widget.tag_config(tag_name, background=self.colors['replaced'])
+        
+        if self.pixel_inspector is not None:
+            self.pixel_inspector.reload()
+        if self.statistics_panel is not None:
+            self.statistics_panel.refresh()
+    
+    def jump_to_offset(self, offset: int):
+        """Scroll the hex view to a byte offset and mark it"""
+        bytes_per_line = 16
+        line_num = offset // bytes_per_line + 1
+        col_start = 10 + (offset % bytes_per_line) * 3
+        
+        self.text_widget.tag_remove('cursor', 1.0, tk.END)
+        self.text_widget.tag_add('cursor', f"{line_num}.{col_start}", f"{line_num}.{col_start + 2}")
+        self.text_widget.tag_config('cursor', background='red', foreground='white')
+        self.text_widget.tag_raise('cursor')
+        self.text_widget.see(f"{line_num}.{col_start}")
+        self.status_label.config(text=f"Offset: {offset} (0x{offset:08X})")
+    
+    def open_pixel_inspector(self):
+        """Open the zoomable pixel inspector for the loaded image"""
+        if not self.binary_data:
+            messagebox.showwarning("Warning", "No binary data loaded. Please load a BMP file first.")
+            return
+        
+        if self.pixel_inspector is not None:
+            self.pixel_inspector.window.lift()
+            return
+        
+        self.pixel_inspector = PixelInspector(self)
+    
+    def open_statistics_panel(self):
+        """Open the histogram and entropy panel for the loaded file"""
+        if not self.binary_data:
+            messagebox.showwarning("Warning", "No binary data loaded. Please load a BMP file first.")
+            return
+        
+        if self.statistics_panel is not None:
+            self.statistics_panel.window.lift()
+            return
+        
+        self.statistics_panel = StatisticsPanel(self)
     
     def export_binary(self):
         """Export binary data from text box back to image file"""
@@ -559,31 +1534,11 @@ class BMPAnalyzer:
     
     def get_pixel_data_range(self) -> Tuple[int, int]:
         """Get the start and end positions of pixel data section"""
-        if not self.binary_data or len(self.binary_data) < 14:
-            return None, None
-        
-        # Get pixel data offset (at offset 10 in BMP header)
-        pixel_data_offset = struct.unpack('<I', self.binary_data[10:14])[0]
-        
-        # Get DIB header size
-        dib_header_size = struct.unpack('<I', self.binary_data[14:18])[0]
-        
-        # Calculate pixel data size
-        if dib_header_size >= 40:
-            width = struct.unpack('<i', self.binary_data[18:22])[0]
-            height = struct.unpack('<i', self.binary_data[22:26])[0]
-            bits_per_pixel = struct.unpack('<H', self.binary_data[28:30])[0]
-            
-            # Calculate row size (with padding to 4-byte boundary)
-            row_size = ((width * bits_per_pixel + 31) // 32) * 4
-            pixel_data_size = abs(height) * row_size
-            
-            file_size = len(self.binary_data)
-            pixel_data_end = min(pixel_data_offset + pixel_data_size, file_size)
-            
-            return pixel_data_offset, pixel_data_end
-        
-        return pixel_data_offset, len(self.binary_data)
+        return pixel_data_range(self.binary_data)
+    
+    def get_pixel_layout(self) -> Dict:
+        """Return the pixel section geometry from the DIB header, or None if it cannot be decoded"""
+        return read_pixel_layout(self.binary_data)
     
     def embed_string(self):
         """Embed a string into the pixel data by replacing random bytes"""
@@ -604,35 +1559,17 @@ class BMPAnalyzer:
             messagebox.showerror("Error", f"Failed to encode string: {str(e)}")
             return
         
-        # Get pixel data range
-        pixel_start, pixel_end = self.get_pixel_data_range()
-        if pixel_start is None or pixel_end is None:
-            messagebox.showerror("Error", "Could not determine pixel data range.")
-            return
-        
-        pixel_data_size = pixel_end - pixel_start
-        if pixel_data_size < len(string_bytes):
-            messagebox.showerror("Error", 
-                f"String is too long ({len(string_bytes)} bytes). "
-                f"Pixel data only has {pixel_data_size} bytes available.")
+        # Replace random pixel data bytes, keeping positions in character order
+        try:
+            embedded_data, positions = embed_payload(self.binary_data, string_bytes)
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
             return
         
-        # Convert binary_data to bytearray for modification
-        data_array = bytearray(self.binary_data)
-        
-        # Generate random positions within pixel data
-        available_positions = list(range(pixel_start, pixel_end))
-        random.shuffle(available_positions)
-        
-        # Store positions and replace bytes in order (preserve character order)
-        self.replaced_byte_positions = []
-        for i, byte_val in enumerate(string_bytes):
-            pos = available_positions[i]
-            self.replaced_byte_positions.append(pos)  # Keep in order, don't sort
-            data_array[pos] = byte_val
-        
-        # Update binary data
-        self.binary_data = bytes(data_array)
+        # Update binary data; only blocks containing the new bytes need new statistics
+        self.replaced_byte_positions = positions
+        self.binary_data = embedded_data
+        self.block_stats.mark_dirty(self.replaced_byte_positions)
         
         # Update display
         self.analyze_and_display()
@@ -713,13 +1650,10 @@ class BMPAnalyzer:
                 return
             
             # Extract bytes from positions in order (preserves character order)
-            extracted_bytes = []
-            for pos in positions:
-                if 0 <= pos < len(self.binary_data):
-                    extracted_bytes.append(self.binary_data[pos])
-                else:
-                    messagebox.showwarning("Warning", 
-                        f"Position {pos} is out of range. Some data may be missing.")
+            extracted_bytes, out_of_range = extract_payload(self.binary_data, positions)
+            for pos in out_of_range:
+                messagebox.showwarning("Warning", 
+                    f"Position {pos} is out of range. Some data may be missing.")
             
             # Convert bytes to string
             try:
@@ -753,7 +1687,577 @@ class BMPAnalyzer:
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load ADR file: {str(e)}")
 
+class PixelInspector:
+    """Zoomable pixel view that decodes only the tiles on screen"""
+    
+    TILE_SIZE = 256        # Tile edge in screen pixels
+    CACHE_TILES = 256      # Decoded tiles kept in the LRU cache
+    ZOOM_LEVELS = [1 / 16, 1 / 8, 1 / 4, 1 / 2, 1, 2, 4, 8, 16, 32]
+    
+    def __init__(self, analyzer):
+        self.analyzer = analyzer
+        self.window = tk.Toplevel(analyzer.root)
+        self.window.title("Pixel Inspector")
+        self.window.geometry("800x600")
+        
+        self.layout = None
+        self.palette = None
+        self.tile_cache = OrderedDict()  # (zoom, tile_x, tile_y) -> PhotoImage
+        self.zoom_index = self.ZOOM_LEVELS.index(1)
+        self.view_x = 0.0  # Image coordinate at the canvas origin
+        self.view_y = 0.0
+        self.drag_start = None
+        self.selected_pixel = None
+        self.replaced_pixels = []
+        self.redraw_pending = False
+        
+        self.canvas = tk.Canvas(self.window, bg='#404040', highlightthickness=0)
+        self.canvas.pack(fill=tk.BOTH, expand=True)
+        
+        self.info_label = ttk.Label(self.window, text="", relief=tk.SUNKEN)
+        self.info_label.pack(fill=tk.X)
+        
+        self.canvas.bind('<Configure>', lambda event: self.schedule_redraw())
+        self.canvas.bind('<ButtonPress-1>', self.on_press)
+        self.canvas.bind('<B1-Motion>', self.on_drag)
+        self.canvas.bind('<ButtonRelease-1>', self.on_release)
+        self.canvas.bind('<MouseWheel>', self.on_wheel)
+        self.canvas.bind('<Button-4>', self.on_wheel)
+        self.canvas.bind('<Button-5>', self.on_wheel)
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+        
+        self.reload()
+    
+    @property
+    def zoom(self) -> float:
+        return self.ZOOM_LEVELS[self.zoom_index]
+    
+    def close(self):
+        self.analyzer.pixel_inspector = None
+        self.window.destroy()
+    
+    def reload(self):
+        """Re-read the pixel layout and drop cached tiles after the data changed"""
+        self.tile_cache.clear()
+        self.layout = self.analyzer.get_pixel_layout()
+        self.palette = None
+        self.replaced_pixels = []
+        
+        if self.layout is None:
+            self.canvas.delete("all")
+            self.info_label.config(text="Pixel data cannot be decoded (invalid header or unsupported format)")
+            return
+        
+        if self.selected_pixel is not None:
+            x, y = self.selected_pixel
+            if x >= self.layout['width'] or y >= self.layout['height']:
+                self.selected_pixel = None
+        
+        if self.layout['bits_per_pixel'] <= 8:
+            self.palette = self.read_palette()
+        
+        for pos in self.analyzer.replaced_byte_positions:
+            pixel = self.pixel_at_offset(pos)
+            if pixel is not None:
+                self.replaced_pixels.append(pixel)
+        
+        self.schedule_redraw()
+    
+    def read_palette(self) -> List[int]:
+        """Read the color table as a flat RGB list for Image.putpalette"""
+        data = self.analyzer.binary_data
+        layout = self.layout
+        bits_per_pixel = layout['bits_per_pixel']
+        entry_size = 3 if layout['dib_header_size'] == 12 else 4
+        palette_start = 14 + layout['dib_header_size']
+        count = min(1 << bits_per_pixel, (layout['pixel_start'] - palette_start) // entry_size)
+        
+        palette = []
+        for i in range(count):
+            entry = palette_start + i * entry_size
+            blue, green, red = data[entry], data[entry + 1], data[entry + 2]
+            palette.extend((red, green, blue))
+        
+        # Images without a color table fall back to a grayscale ramp
+        if not palette:
+            levels = 1 << bits_per_pixel
+            for i in range(levels):
+                gray = i * 255 // (levels - 1)
+                palette.extend((gray, gray, gray))
+        
+        return palette
+    
+    def file_row(self, y: int) -> int:
+        """Map an image row (top = 0) to its row in the pixel section"""
+        if self.layout['bottom_up']:
+            return self.layout['height'] - 1 - y
+        return y
+    
+    def offset_of_pixel(self, x: int, y: int) -> int:
+        """Byte offset in the file of the first byte holding pixel (x, y)"""
+        layout = self.layout
+        return (layout['pixel_start'] + self.file_row(y) * layout['row_size']
+                + (x * layout['bits_per_pixel']) // 8)
+    
+    def pixel_at_offset(self, pos: int):
+        """Return the (x, y) pixel a file byte belongs to, or None for headers and row padding"""
+        layout = self.layout
+        relative = pos - layout['pixel_start']
+        if relative < 0 or pos >= layout['pixel_end']:
+            return None
+        
+        row, byte_in_row = divmod(relative, layout['row_size'])
+        x = byte_in_row * 8 // layout['bits_per_pixel']
+        if x >= layout['width'] or row >= layout['height']:
+            return None
+        
+        y = layout['height'] - 1 - row if layout['bottom_up'] else row
+        return x, y
+    
+    def decode_tile(self, tile_x: int, tile_y: int):
+        """Decode one tile straight from the pixel section and scale it to screen size"""
+        data = self.analyzer.binary_data
+        layout = self.layout
+        zoom = self.zoom
+        span = int(self.TILE_SIZE / zoom)  # Image pixels covered by one tile edge
+        step = max(1, span // self.TILE_SIZE)  # Rows to skip when zoomed out
+        bits_per_pixel = layout['bits_per_pixel']
+        
+        x0 = tile_x * span
+        y0 = tile_y * span
+        x1 = min(x0 + span, layout['width'])
+        y1 = min(y0 + span, layout['height'])
+        if x0 >= x1 or y0 >= y1:
+            return None
+        
+        row_bytes = ((x1 - x0) * bits_per_pixel + 7) // 8
+        rows = range(y0, y1, step)
+        buffer = bytearray()
+        for y in rows:
+            start = self.offset_of_pixel(x0, y)
+            chunk = data[start:start + row_bytes]
+            buffer += chunk
+            if len(chunk) < row_bytes:
+                buffer += bytes(row_bytes - len(chunk))
+        
+        mode, raw_mode = layout['mode'], layout['raw_mode']
+        img = Image.frombytes(mode, (x1 - x0, len(rows)), bytes(buffer), 'raw', raw_mode, row_bytes, 1)
+        if mode == 'P':
+            img.putpalette(self.palette)
+            img = img.convert('RGB')
+        
+        screen_width = max(1, int(round((x1 - x0) * zoom)))
+        screen_height = max(1, int(round((y1 - y0) * zoom)))
+        try:
+            img = img.resize((screen_width, screen_height), Image.Resampling.NEAREST)
+        except AttributeError:
+            img = img.resize((screen_width, screen_height), Image.NEAREST)
+        
+        return ImageTk.PhotoImage(img)
+    
+    def get_tile(self, tile_x: int, tile_y: int):
+        """Return a tile from the LRU cache, decoding it on a miss"""
+        key = (self.zoom_index, tile_x, tile_y)
+        if key in self.tile_cache:
+            self.tile_cache.move_to_end(key)
+            return self.tile_cache[key]
+        
+        photo = self.decode_tile(tile_x, tile_y)
+        self.tile_cache[key] = photo
+        while len(self.tile_cache) > self.CACHE_TILES:
+            self.tile_cache.popitem(last=False)
+        return photo
+    
+    def schedule_redraw(self):
+        """Coalesce redraw requests from pan/zoom events into one idle callback"""
+        if not self.redraw_pending:
+            self.redraw_pending = True
+            self.window.after_idle(self.redraw)
+    
+    def redraw(self):
+        """Draw the visible tiles, replaced-byte overlay and selection"""
+        self.redraw_pending = False
+        if self.layout is None:
+            return
+        
+        self.canvas.delete("all")
+        canvas_width = self.canvas.winfo_width()
+        canvas_height = self.canvas.winfo_height()
+        zoom = self.zoom
+        span = int(self.TILE_SIZE / zoom)
+        
+        # Only tiles intersecting the viewport are decoded
+        first_tile_x = max(0, int(self.view_x // span))
+        first_tile_y = max(0, int(self.view_y // span))
+        last_tile_x = min((self.layout['width'] - 1) // span, int((self.view_x + canvas_width / zoom) // span))
+        last_tile_y = min((self.layout['height'] - 1) // span, int((self.view_y + canvas_height / zoom) // span))
+        
+        for tile_y in range(first_tile_y, last_tile_y + 1):
+            for tile_x in range(first_tile_x, last_tile_x + 1):
+                photo = self.get_tile(tile_x, tile_y)
+                if photo is None:
+                    continue
+                screen_x = (tile_x * span - self.view_x) * zoom
+                screen_y = (tile_y * span - self.view_y) * zoom
+                self.canvas.create_image(screen_x, screen_y, anchor=tk.NW, image=photo)
+        
+        # Overlay replaced bytes (steganography) on the pixels that hold them
+        marker = max(zoom, 3)
+        for x, y in self.replaced_pixels:
+            screen_x = (x - self.view_x) * zoom
+            screen_y = (y - self.view_y) * zoom
+            if -marker <= screen_x <= canvas_width and -marker <= screen_y <= canvas_height:
+                self.canvas.create_rectangle(screen_x, screen_y, screen_x + marker, screen_y + marker,
+                                             outline=self.analyzer.colors['replaced'])
+        
+        if self.selected_pixel is not None:
+            x, y = self.selected_pixel
+            screen_x = (x - self.view_x) * zoom
+            screen_y = (y - self.view_y) * zoom
+            self.canvas.create_rectangle(screen_x - 1, screen_y - 1, screen_x + marker + 1, screen_y + marker + 1,
+                                         outline='red', width=2)
+        
+        self.update_info()
+    
+    def update_info(self):
+        layout = self.layout
+        text = (f"{layout['width']} × {layout['height']} | {layout['bits_per_pixel']} bpp | "
+                f"{'bottom-up' if layout['bottom_up'] else 'top-down'} | "
+                f"Stride: {layout['row_size']} bytes | Zoom: {self.zoom:g}x")
+        if self.selected_pixel is not None:
+            x, y = self.selected_pixel
+            text += f" | Pixel ({x}, {y}) @ {self.offset_of_pixel(x, y):08X}"
+        self.info_label.config(text=text)
+    
+    def on_press(self, event):
+        self.drag_start = (event.x, event.y, self.view_x, self.view_y)
+    
+    def on_drag(self, event):
+        if self.drag_start is None:
+            return
+        start_x, start_y, view_x, view_y = self.drag_start
+        self.view_x = view_x - (event.x - start_x) / self.zoom
+        self.view_y = view_y - (event.y - start_y) / self.zoom
+        self.schedule_redraw()
+    
+    def on_release(self, event):
+        if self.drag_start is None:
+            return
+        start_x, start_y = self.drag_start[0], self.drag_start[1]
+        self.drag_start = None
+        if self.layout is None:
+            return
+        
+        # A release without movement is a click: select the pixel under the cursor
+        if abs(event.x - start_x) <= 2 and abs(event.y - start_y) <= 2:
+            # floor, not int: clicks left of or above the image must not truncate to pixel 0
+            x = math.floor(self.view_x + event.x / self.zoom)
+            y = math.floor(self.view_y + event.y / self.zoom)
+            if 0 <= x < self.layout['width'] and 0 <= y < self.layout['height']:
+                self.selected_pixel = (x, y)
+                self.analyzer.jump_to_offset(self.offset_of_pixel(x, y))
+                self.schedule_redraw()
+    
+    def on_wheel(self, event):
+        if self.layout is None:
+            return
+        if getattr(event, 'num', None) == 4 or getattr(event, 'delta', 0) > 0:
+            new_index = min(self.zoom_index + 1, len(self.ZOOM_LEVELS) - 1)
+        else:
+            new_index = max(self.zoom_index - 1, 0)
+        if new_index == self.zoom_index:
+            return
+        
+        # Keep the image point under the cursor fixed while zooming
+        anchor_x = self.view_x + event.x / self.zoom
+        anchor_y = self.view_y + event.y / self.zoom
+        self.zoom_index = new_index
+        self.view_x = anchor_x - event.x / self.zoom
+        self.view_y = anchor_y - event.y / self.zoom
+        self.schedule_redraw()
+
+
+class StatisticsPanel:
+    """Byte/channel histograms and an entropy strip aligned with the file sections"""
+    
+    CHANNEL_COLORS = {'Blue': '#4060FF', 'Green': '#30A030', 'Red': '#E03030', 'Alpha': '#808080'}
+    
+    def __init__(self, analyzer):
+        self.analyzer = analyzer
+        self.window = tk.Toplevel(analyzer.root)
+        self.window.title("Statistics")
+        self.window.geometry("800x600")
+        
+        self.sections = []
+        self.anomalies = []
+        self.redraw_pending = False
+        
+        strip_frame = ttk.LabelFrame(self.window, text="Entropy per Block (click to jump)", padding="5")
+        strip_frame.pack(fill=tk.X, padx=10, pady=(10, 5))
+        self.strip_canvas = tk.Canvas(strip_frame, height=70, bg='white', highlightthickness=0)
+        self.strip_canvas.pack(fill=tk.X)
+        
+        histogram_frame = ttk.LabelFrame(self.window, text="Byte Histogram", padding="5")
+        histogram_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        self.histogram_canvas = tk.Canvas(histogram_frame, height=120, bg='white', highlightthickness=0)
+        self.histogram_canvas.pack(fill=tk.BOTH, expand=True)
+        
+        channel_frame = ttk.LabelFrame(self.window, text="Channel Histograms (pixel data)", padding="5")
+        channel_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        self.channel_canvas = tk.Canvas(channel_frame, height=120, bg='white', highlightthickness=0)
+        self.channel_canvas.pack(fill=tk.BOTH, expand=True)
+        
+        self.info_label = ttk.Label(self.window, text="", relief=tk.SUNKEN)
+        self.info_label.pack(fill=tk.X)
+        
+        for canvas in (self.strip_canvas, self.histogram_canvas, self.channel_canvas):
+            canvas.bind('<Configure>', lambda event: self.schedule_redraw())
+        self.strip_canvas.bind('<Motion>', self.on_strip_motion)
+        self.strip_canvas.bind('<Button-1>', self.on_strip_click)
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+        
+        self.refresh()
+    
+    @property
+    def stats(self) -> BlockStatistics:
+        return self.analyzer.block_stats
+    
+    def close(self):
+        self.analyzer.statistics_panel = None
+        self.window.destroy()
+    
+    def refresh(self):
+        """Rescan dirty blocks and redraw"""
+        data = self.analyzer.binary_data
+        rescanned = self.stats.update(data, self.analyzer.get_pixel_layout())
+        self.sections = self.analyzer.parse_bmp_structure()
+        self.anomalies = self.stats.anomalous_blocks(self.sections)
+        self.analyzer.status_label.config(
+            text=f"Statistics: rescanned {rescanned} of {self.stats.block_count} blocks"
+        )
+        self.schedule_redraw()
+    
+    def schedule_redraw(self):
+        if not self.redraw_pending:
+            self.redraw_pending = True
+            self.window.after_idle(self.redraw)
+    
+    def redraw(self):
+        self.redraw_pending = False
+        self.draw_strip()
+        self.draw_histograms(self.histogram_canvas, [('Bytes', '#404040', self.stats.total_histogram)])
+        self.draw_histograms(self.channel_canvas, [
+            (name, self.CHANNEL_COLORS[name], histogram)
+            for name, histogram in zip(self.stats.channel_names, self.stats.channel_totals)
+        ])
+        self.info_label.config(
+            text=f"{self.stats.block_count} blocks of {self.stats.block_size} bytes | "
+                 f"File entropy: {shannon_entropy(self.stats.total_histogram):.3f} bits/byte | "
+                 f"Anomalous blocks: {len(self.anomalies)}"
+        )
+    
+    def entropy_color(self, entropy: float) -> str:
+        """Dark blue for uniform data through yellow for random-looking data"""
+        level = min(max(entropy / 8.0, 0.0), 1.0)
+        return f"#{int(255 * level):02X}{int(220 * level):02X}{int(160 * (1 - level)):02X}"
+    
+    def draw_strip(self):
+        canvas = self.strip_canvas
+        canvas.delete("all")
+        width = canvas.winfo_width()
+        file_size = self.stats.data_size
+        if width <= 1 or not file_size:
+            return
+        
+        scale = width / file_size
+        block_size = self.stats.block_size
+        
+        # Anomaly markers (top), entropy strip (middle), section band (bottom)
+        for block in self.anomalies:
+            x0 = block * block_size * scale
+            x1 = max(x0 + 2, min((block + 1) * block_size, file_size) * scale)
+            canvas.create_rectangle(x0, 0, x1, 8, fill='red', outline='')
+        
+        for block, entropy in enumerate(self.stats.entropies):
+            x0 = block * block_size * scale
+            x1 = max(x0 + 1, min((block + 1) * block_size, file_size) * scale)
+            color = self.entropy_color(entropy)
+            canvas.create_rectangle(x0, 10, x1, 50, fill=color, outline='')
+        
+        for start, end, section_type in self.sections:
+            canvas.create_rectangle(start * scale, 54, max(start * scale + 1, end * scale), 68,
+                                    fill=self.analyzer.colors[section_type], outline='gray')
+    
+    def draw_histograms(self, canvas, series):
+        """Draw one 256-bin bar chart per (label, color, histogram) side by side"""
+        canvas.delete("all")
+        width = canvas.winfo_width()
+        height = canvas.winfo_height()
+        if width <= 1 or height <= 1:
+            return
+        if not series:
+            canvas.create_text(width // 2, height // 2, text="Not available for this bit depth")
+            return
+        
+        chart_width = width / len(series)
+        for index, (label, color, histogram) in enumerate(series):
+            left = index * chart_width + 5
+            bar_width = (chart_width - 10) / 256
+            peak = max(histogram) or 1
+            for value, count in enumerate(histogram):
+                if count:
+                    bar_height = (height - 20) * count / peak
+                    x0 = left + value * bar_width
+                    canvas.create_rectangle(x0, height - 15 - bar_height, x0 + max(bar_width, 1), height - 15,
+                                            fill=color, outline='')
+            canvas.create_text(left, height - 2, anchor=tk.SW, text=f"{label} (peak {peak})")
+    
+    def block_at(self, x: int) -> int:
+        width = self.strip_canvas.winfo_width()
+        if width <= 1 or not self.stats.data_size:
+            return None
+        offset = int(x / width * self.stats.data_size)
+        block = offset // self.stats.block_size
+        if 0 <= block < self.stats.block_count:
+            return block
+        return None
+    
+    def on_strip_motion(self, event):
+        block = self.block_at(event.x)
+        if block is None:
+            return
+        start = block * self.stats.block_size
+        end = min(start + self.stats.block_size, self.stats.data_size)
+        section = next((name for s, e, name in self.sections if s <= start < e), 'unknown')
+        flag = " | ANOMALOUS" if block in self.anomalies else ""
+        self.info_label.config(
+            text=f"Block {block}: {start:08X}-{end - 1:08X} | Section: {section} | "
+                 f"Entropy: {self.stats.entropies[block]:.3f} bits/byte{flag}"
+        )
+    
+    def on_strip_click(self, event):
+        block = self.block_at(event.x)
+        if block is not None:
+            self.analyzer.jump_to_offset(block * self.stats.block_size)
+
+
+def run_scan(args) -> int:
+    index = ContentIndex(args.index)
+    counts = {'analyzed': 0, 'cached': 0, 'deduplicated': 0, 'error': 0}
+    try:
+        for file_path in find_bmp_files(args.paths):
+            try:
+                result = process_file(file_path, index)
+            except OSError as e:
+                result = {'path': file_path, 'status': 'error', 'message': str(e)}
+            counts[result['status']] += 1
+            
+            if not args.sections:
+                result.pop('sections', None)
+            print(json.dumps(result))
+    finally:
+        index.close()
+    
+    summary = ', '.join(f"{count} {status}" for status, count in counts.items())
+    print(f"Scanned {sum(counts.values())} files: {summary}", file=sys.stderr)
+    return 1 if counts['error'] else 0
+
+
+def run_prune(args) -> int:
+    index = ContentIndex(args.index)
+    try:
+        files_removed, results_removed = index.prune()
+        if args.compact:
+            index.compact()
+    finally:
+        index.close()
+    print(f"Pruned {files_removed} missing files and {results_removed} unreferenced results", file=sys.stderr)
+    return 0
+
+
+def run_compact(args) -> int:
+    index = ContentIndex(args.index)
+    try:
+        index.compact()
+    finally:
+        index.close()
+    print(f"Compacted {args.index}", file=sys.stderr)
+    return 0
+
+
+def positive_int(value: str) -> int:
+    """argparse type for counts that must be at least 1"""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
+def run_watch(args) -> int:
+    if os.path.realpath(args.spool) == os.path.realpath(args.output):
+        print("Output directory must differ from the spool directory", file=sys.stderr)
+        return 2
+    
+    payload = args.embed.encode('utf-8') if args.embed is not None else None
+    adr_positions = None
+    if args.extract_adr:
+        with open(args.extract_adr, 'r') as f:
+            adr_positions = json.load(f).get('positions', [])
+    
+    # Workers open their own connections; check the index once up front so a bad path fails fast
+    if args.index is not None:
+        try:
+            ContentIndex(args.index).close()
+        except (sqlite3.Error, OSError) as e:
+            print(f"Cannot open index {args.index}: {e}", file=sys.stderr)
+            return 2
+    
+    watcher = SpoolWatcher(args.spool, args.output, workers=args.workers, queue_size=args.queue_size,
+                           poll_interval=args.poll_interval, settle_time=args.settle_time,
+                           payload=payload, adr_positions=adr_positions, index_path=args.index)
+    watcher.run(once=args.once, metrics_interval=args.metrics_interval)
+    return 1 if watcher.metrics.counters['failed'] else 0
+
+
 def main():
+    parser = argparse.ArgumentParser(description="BMP Binary Analyzer. Starts the GUI when no command is given.")
+    subparsers = parser.add_subparsers(dest='command')
+    
+    scan_parser = subparsers.add_parser('scan', help="Validate and analyze BMP files, skipping content already indexed")
+    scan_parser.add_argument('paths', nargs='+', help="BMP files or directories to scan")
+    scan_parser.add_argument('--index', default=DEFAULT_INDEX_PATH, help="Index database path")
+    scan_parser.add_argument('--sections', action='store_true', help="Include parsed sections in the output")
+    scan_parser.set_defaults(handler=run_scan)
+    
+    prune_parser = subparsers.add_parser('prune', help="Remove index entries for files that no longer exist")
+    prune_parser.add_argument('--index', default=DEFAULT_INDEX_PATH, help="Index database path")
+    prune_parser.add_argument('--compact', action='store_true', help="Compact the index after pruning")
+    prune_parser.set_defaults(handler=run_prune)
+    
+    compact_parser = subparsers.add_parser('compact', help="Reclaim unused space in the index")
+    compact_parser.add_argument('--index', default=DEFAULT_INDEX_PATH, help="Index database path")
+    compact_parser.set_defaults(handler=run_compact)
+    
+    watch_parser = subparsers.add_parser('watch', help="Continuously process BMP files dropped into a spool directory")
+    watch_parser.add_argument('spool', help="Directory to watch for .bmp files")
+    watch_parser.add_argument('output', help="Directory for result JSON, embedded images and metrics")
+    watch_parser.add_argument('--workers', type=positive_int, default=4, help="Worker threads")
+    watch_parser.add_argument('--queue-size', type=positive_int, default=16, help="Maximum files waiting for a worker")
+    watch_parser.add_argument('--poll-interval', type=float, default=1.0, help="Seconds between spool scans")
+    watch_parser.add_argument('--settle-time', type=float, default=2.0,
+                              help="Seconds a file must stay unchanged before it is processed")
+    watch_parser.add_argument('--metrics-interval', type=float, default=10.0, help="Seconds between metrics reports")
+    watch_parser.add_argument('--index', default=None, help="Reuse results from this index database")
+    watch_parser.add_argument('--once', action='store_true', help="Exit once the spool has been processed")
+    payload_group = watch_parser.add_mutually_exclusive_group()
+    payload_group.add_argument('--embed', default=None, help="Embed this string and write the image and ADR file")
+    payload_group.add_argument('--extract-adr', default=None, help="Extract the string at the positions in this ADR file")
+    watch_parser.set_defaults(handler=run_watch)
+    
+    args = parser.parse_args()
+    if args.command is not None:
+        sys.exit(args.handler(args))
+    
     root = tk.Tk()
     app = BMPAnalyzer(root)
     root.mainloop()
@@ -0,0 +1,126 @@
+import os
+import random
+import struct
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import bmp_analyzer
+from bmp_analyzer import BlockStatistics, byte_histogram, embed_payload, read_pixel_layout
+
+
+def build_bmp(width, height, bits_per_pixel, seed=0):
+    """Build a BITMAPINFOHEADER file with random pixel bytes and zeroed row padding"""
+    rnd = random.Random(seed)
+    row_bytes = width * bits_per_pixel // 8
+    row_size = ((width * bits_per_pixel + 31) // 32) * 4
+    pixels = b''.join(bytes(rnd.randrange(256) for _ in range(row_bytes)) + bytes(row_size - row_bytes)
+                      for _ in range(height))
+
+    dib = struct.pack('<IiiHHIIiiII', 40, width, height, 1, bits_per_pixel, 0, len(pixels), 0, 0, 0, 0)
+    header = b'BM' + struct.pack('<IHHI', 54 + len(pixels), 0, 0, 54)
+    return header + dib + pixels
+
+
+def full_scan(data):
+    stats = BlockStatistics()
+    stats.update(data, read_pixel_layout(data))
+    return stats
+
+
+def reference_channels(data):
+    """Per-channel histograms computed pixel by pixel, skipping row padding"""
+    layout = read_pixel_layout(data)
+    bytes_per_pixel = layout['bits_per_pixel'] // 8
+    channels = [[0] * 256 for _ in range(bytes_per_pixel)]
+    for row in range(layout['height']):
+        row_start = layout['pixel_start'] + row * layout['row_size']
+        for i in range(layout['width'] * bytes_per_pixel):
+            channels[i % bytes_per_pixel][data[row_start + i]] += 1
+    return channels
+
+
+class BlockStatisticsTest(unittest.TestCase):
+    def assert_same_statistics(self, incremental, fresh):
+        self.assertEqual(incremental.block_size, fresh.block_size)
+        self.assertEqual(incremental.total_histogram, fresh.total_histogram)
+        self.assertEqual(incremental.histograms, fresh.histograms)
+        self.assertEqual(incremental.entropies, fresh.entropies)
+        self.assertEqual(incremental.channel_names, fresh.channel_names)
+        self.assertEqual(incremental.channel_totals, fresh.channel_totals)
+        self.assertEqual(incremental.channel_histograms, fresh.channel_histograms)
+
+    def test_full_scan_matches_reference(self):
+        # Width 301 at 24 bpp leaves one padding byte per row and pixels straddling block edges
+        for width, bits_per_pixel in ((301, 24), (97, 32)):
+            data = build_bmp(width, 60, bits_per_pixel)
+            stats = full_scan(data)
+            self.assertEqual(stats.total_histogram, byte_histogram(data))
+            self.assertEqual(stats.channel_totals, reference_channels(data))
+
+    def test_incremental_embeds_match_full_scan(self):
+        random.seed(1234)
+        data = build_bmp(301, 200, 24)
+        stats = full_scan(data)
+        layout = read_pixel_layout(data)
+
+        for length in (1, 5, 17, 40):
+            data, positions = embed_payload(data, os.urandom(length))
+            stats.mark_dirty(positions)
+            rescanned = stats.update(data, layout)
+            self.assertLess(rescanned, stats.block_count)
+            self.assert_same_statistics(stats, full_scan(data))
+
+    def test_embed_in_first_block_rescans_only_that_block(self):
+        data = bytearray(build_bmp(301, 200, 24))
+        stats = full_scan(bytes(data))
+        layout = read_pixel_layout(bytes(data))
+
+        data[60] ^= 0xFF
+        stats.mark_dirty([60])
+        self.assertEqual(stats.update(bytes(data), layout), 1)
+        self.assert_same_statistics(stats, full_scan(bytes(data)))
+
+    def test_edit_at_block_boundary_updates_straddling_pixel(self):
+        data = bytearray(build_bmp(301, 200, 24))
+        stats = full_scan(bytes(data))
+        layout = read_pixel_layout(bytes(data))
+
+        # Byte at the start of a block may belong to a pixel that starts in the previous block
+        position = stats.block_size * 5
+        data[position] ^= 0xFF
+        stats.mark_dirty([position])
+        stats.update(bytes(data), layout)
+        self.assert_same_statistics(stats, full_scan(bytes(data)))
+
+    def test_layout_change_forces_full_rescan(self):
+        data = bytearray(build_bmp(301, 200, 24))
+        stats = full_scan(bytes(data))
+
+        # Flip row order: same size, different layout
+        struct.pack_into('<i', data, 22, -200)
+        rescanned = stats.update(bytes(data), read_pixel_layout(bytes(data)))
+        self.assertEqual(rescanned, stats.block_count)
+        self.assertFalse(read_pixel_layout(bytes(data))['bottom_up'])
+
+    def test_size_change_forces_full_rescan(self):
+        data = build_bmp(301, 200, 24)
+        stats = full_scan(data)
+        longer = data + bytes(5000)
+        self.assertEqual(stats.update(longer, read_pixel_layout(longer)), stats.block_count)
+        self.assertEqual(stats.total_histogram, byte_histogram(longer))
+
+    def test_anomalous_block_is_flagged(self):
+        data = bytearray(build_bmp(301, 200, 24))
+        stats = full_scan(bytes(data))
+        block = 50
+        start = block * stats.block_size
+        data[start:start + stats.block_size] = bytes(stats.block_size)
+        stats.mark_dirty(range(start, start + stats.block_size))
+        stats.update(bytes(data), read_pixel_layout(bytes(data)))
+        self.assertIn(block, stats.anomalous_blocks(bmp_analyzer.parse_bmp_sections(bytes(data))))
+
+
+if __name__ == '__main__':
+    unittest.main()
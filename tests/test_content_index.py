@@ -0,0 +1,130 @@
+import os
+import shutil
+import sqlite3
+import struct
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import bmp_analyzer
+from bmp_analyzer import ContentIndex, process_file
+
+
+def build_bmp(width=8, height=4, fill=0):
+    row_size = ((width * 24 + 31) // 32) * 4
+    pixels = bytes([fill]) * (row_size * height)
+    dib = struct.pack('<IiiHHIIiiII', 40, width, height, 1, 24, 0, len(pixels), 0, 0, 0, 0)
+    return b'BM' + struct.pack('<IHHI', 54 + len(pixels), 0, 0, 54) + dib + pixels
+
+
+class ContentIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.index = ContentIndex(os.path.join(self.directory, 'index.sqlite'))
+
+    def tearDown(self):
+        self.index.close()
+        shutil.rmtree(self.directory)
+
+    def write(self, name, data):
+        path = os.path.join(self.directory, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def test_new_file_is_analyzed_then_cached(self):
+        path = self.write('a.bmp', build_bmp())
+        first = process_file(path, self.index)
+        self.assertEqual(first['status'], 'analyzed')
+        self.assertEqual(first['validation'], bmp_analyzer.BMP_OK)
+
+        # Unchanged size and mtime: answered without opening the file
+        with mock.patch('builtins.open', side_effect=AssertionError("file was read")):
+            second = process_file(path, self.index)
+        self.assertEqual(second['status'], 'cached')
+        self.assertEqual(second['digest'], first['digest'])
+        self.assertEqual(second['entropy'], first['entropy'])
+
+    def test_same_content_under_another_path_is_deduplicated(self):
+        process_file(self.write('a.bmp', build_bmp()), self.index)
+        copy = process_file(self.write('copy.bmp', build_bmp()), self.index)
+        self.assertEqual(copy['status'], 'deduplicated')
+
+    def test_changed_mtime_rehashes(self):
+        path = self.write('a.bmp', build_bmp())
+        process_file(path, self.index)
+
+        # Touched but identical: rehashed and matched by digest
+        os.utime(path, ns=(1, 1))
+        self.assertEqual(process_file(path, self.index)['status'], 'deduplicated')
+
+        # Rewritten with new content and the same size: analyzed again
+        self.write('a.bmp', build_bmp(fill=0x7F))
+        os.utime(path, ns=(2, 2))
+        result = process_file(path, self.index)
+        self.assertEqual(result['status'], 'analyzed')
+        self.assertEqual(process_file(path, self.index)['status'], 'cached')
+
+    def test_file_changed_while_reading_is_not_remembered(self):
+        path = self.write('a.bmp', build_bmp())
+        stat = os.stat(path)
+        data = build_bmp()
+
+        # The file changes after the caller read it but before the index records it
+        self.write('a.bmp', build_bmp(fill=0x7F))
+        os.utime(path, ns=(stat.st_mtime_ns + 10, stat.st_mtime_ns + 10))
+        process_file(path, self.index, data, stat)
+
+        self.assertEqual(process_file(path, self.index)['status'], 'analyzed')
+
+    def test_data_without_stat_is_rejected(self):
+        path = self.write('a.bmp', build_bmp())
+        with self.assertRaises(ValueError):
+            process_file(path, self.index, build_bmp())
+
+    def test_prune_removes_deleted_files_and_orphaned_results(self):
+        kept = self.write('kept.bmp', build_bmp())
+        removed = self.write('removed.bmp', build_bmp(fill=1))
+        process_file(kept, self.index)
+        process_file(removed, self.index)
+        os.remove(removed)
+
+        self.assertEqual(self.index.prune(), (1, 1))
+        self.assertEqual(self.index.prune(), (0, 0))
+        self.assertEqual(process_file(kept, self.index)['status'], 'cached')
+        self.index.compact()
+
+    def test_results_from_other_analysis_version_are_misses(self):
+        path = self.write('a.bmp', build_bmp())
+        process_file(path, self.index)
+
+        with mock.patch.object(bmp_analyzer, 'ANALYSIS_VERSION', bmp_analyzer.ANALYSIS_VERSION + 1):
+            self.assertEqual(process_file(path, self.index)['status'], 'analyzed')
+            self.assertEqual(process_file(path, self.index)['status'], 'cached')
+
+        # Back on the current version the newer row is stale, and prune drops it
+        self.assertEqual(self.index.prune(), (0, 1))
+        self.assertEqual(process_file(path, self.index)['status'], 'analyzed')
+
+    def test_index_without_version_column_is_migrated(self):
+        self.index.close()
+        path = os.path.join(self.directory, 'old.sqlite')
+        connection = sqlite3.connect(path)
+        connection.executescript("""
+            CREATE TABLE results (digest TEXT PRIMARY KEY, size INTEGER NOT NULL,
+                validation_code TEXT NOT NULL, validation_message TEXT NOT NULL, sections TEXT NOT NULL,
+                entropy REAL, anomalous_blocks INTEGER, analyzed_at REAL NOT NULL);
+            INSERT INTO results VALUES ('digest', 1, 'ok', '', '[]', 0.0, 0, 0.0);
+        """)
+        connection.commit()
+        connection.close()
+
+        self.index = ContentIndex(path)
+        self.assertIsNone(self.index.get_result('digest'))
+
+
+if __name__ == '__main__':
+    unittest.main()
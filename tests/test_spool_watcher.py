@@ -0,0 +1,203 @@
+import argparse
+import json
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import bmp_analyzer
+from bmp_analyzer import SpoolWatcher, atomic_write, positive_int, run_watch
+
+real_scandir = os.scandir
+
+
+def build_bmp(width=8, height=4):
+    row_size = ((width * 24 + 31) // 32) * 4
+    pixels = bytes(row_size * height)
+    dib = struct.pack('<IiiHHIIiiII', 40, width, height, 1, 24, 0, len(pixels), 0, 0, 0, 0)
+    return b'BM' + struct.pack('<IHHI', 54 + len(pixels), 0, 0, 54) + dib + pixels
+
+
+class Clock:
+    """Stand-in for time.monotonic that only moves when told to"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class VanishingScandir:
+    """os.scandir replacement that deletes one file after listing, before the poller stats it"""
+
+    def __init__(self, path, victim):
+        with real_scandir(path) as entries:
+            self.entries = list(entries)
+        os.remove(os.path.join(path, victim))
+
+    def __enter__(self):
+        return iter(self.entries)
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class SpoolWatcherTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.spool = os.path.join(self.directory, 'spool')
+        self.output = os.path.join(self.directory, 'out')
+        os.makedirs(self.spool)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def drop(self, name, data=None):
+        path = os.path.join(self.spool, name)
+        with open(path, 'wb') as f:
+            f.write(build_bmp() if data is None else data)
+        return path
+
+    def run_once(self, watcher, timeout=10):
+        """Run the watcher with once=True, failing instead of hanging if it never returns"""
+        thread = threading.Thread(target=watcher.run, kwargs={'once': True, 'metrics_interval': 3600}, daemon=True)
+        thread.start()
+        thread.join(timeout)
+        self.assertFalse(thread.is_alive(), "watcher did not exit")
+
+    def test_growing_file_waits_until_settled(self):
+        watcher = SpoolWatcher(self.spool, self.output, settle_time=2.0)
+        clock = Clock()
+        path = self.drop('a.bmp')
+
+        with mock.patch.object(bmp_analyzer.time, 'monotonic', clock):
+            self.assertEqual(watcher.poll(), 0)
+
+            # Still being written: each change restarts the settle timer
+            clock.now += 1.5
+            with open(path, 'ab') as f:
+                f.write(bytes(10))
+            self.assertEqual(watcher.poll(), 0)
+            clock.now += 1.5
+            self.assertEqual(watcher.poll(), 0)
+
+            clock.now += 1.0
+            self.assertEqual(watcher.poll(), 1)
+            self.assertEqual(watcher.work_queue.get_nowait(), path)
+
+            # Unchanged files are not queued again
+            clock.now += 10
+            self.assertEqual(watcher.poll(), 0)
+
+    def test_backpressure_keeps_files_pending(self):
+        watcher = SpoolWatcher(self.spool, self.output, queue_size=1, settle_time=2.0)
+        clock = Clock()
+        paths = [self.drop(name) for name in ('a.bmp', 'b.bmp', 'c.bmp')]
+
+        with mock.patch.object(bmp_analyzer.time, 'monotonic', clock):
+            watcher.poll()
+            clock.now += 3
+            self.assertEqual(watcher.poll(), 1)
+            self.assertEqual(watcher.metrics.counters['backpressure'], 1)
+
+            # Only the queued file is done; the rest stay pending with their settle timers intact
+            queued = watcher.work_queue.get_nowait()
+            self.assertEqual(set(watcher.done), {queued})
+            self.assertEqual(set(watcher.pending), set(paths) - {queued})
+            self.assertTrue(all(seen == 1000.0 for _, seen in watcher.pending.values()))
+
+            # Once there is room, a settled file is queued on the next poll without waiting again
+            self.assertEqual(watcher.poll(), 1)
+            self.assertIn(watcher.work_queue.get_nowait(), set(paths) - {queued})
+            self.assertEqual(watcher.poll(), 1)
+            self.assertEqual(len(watcher.done), 3)
+            self.assertEqual(watcher.pending, {})
+
+    def test_file_vanishing_during_scan_is_skipped(self):
+        watcher = SpoolWatcher(self.spool, self.output, settle_time=0)
+        kept = self.drop('kept.bmp')
+        self.drop('gone.bmp')
+
+        with mock.patch.object(bmp_analyzer.os, 'scandir', lambda path: VanishingScandir(path, 'gone.bmp')):
+            watcher.poll()
+        self.assertEqual(list(watcher.pending), [kept])
+
+    def test_atomic_write_uses_default_permissions(self):
+        umask = os.umask(0)
+        os.umask(umask)
+        path = os.path.join(self.directory, 'result.json')
+        atomic_write(path, b'{}')
+
+        self.assertEqual(os.stat(path).st_mode & 0o777, 0o666 & ~umask)
+        self.assertFalse([name for name in os.listdir(self.directory) if name.startswith('.tmp-')])
+
+    def test_sizes_must_be_positive(self):
+        with self.assertRaises(ValueError):
+            SpoolWatcher(self.spool, self.output, workers=0)
+        with self.assertRaises(ValueError):
+            SpoolWatcher(self.spool, self.output, queue_size=0)
+        with self.assertRaises(argparse.ArgumentTypeError):
+            positive_int('0')
+        self.assertEqual(positive_int('3'), 3)
+
+    def test_output_names_do_not_collide(self):
+        for name in ('a.bmp', 'a.BMP', 'metrics.bmp'):
+            self.drop(name)
+        watcher = SpoolWatcher(self.spool, self.output, workers=2, poll_interval=0.01, settle_time=0)
+        self.run_once(watcher)
+
+        results = os.path.join(self.output, 'results')
+        self.assertEqual(sorted(os.listdir(results)), ['a.BMP.json', 'a.bmp.json', 'metrics.bmp.json'])
+        for name in ('a.bmp', 'a.BMP', 'metrics.bmp'):
+            with open(os.path.join(results, f"{name}.json")) as f:
+                self.assertEqual(json.load(f)['path'], os.path.join(self.spool, name))
+        with open(os.path.join(self.output, 'metrics.json')) as f:
+            self.assertEqual(json.load(f)['counters']['completed'], 3)
+
+    def test_unusable_index_exits_with_usage_error(self):
+        args = argparse.Namespace(spool=self.spool, output=self.output, embed=None, extract_adr=None,
+                                  index=self.directory, workers=1, queue_size=1, poll_interval=0.01,
+                                  settle_time=0, metrics_interval=3600, once=True)
+        self.drop('a.bmp')
+        exit_codes = []
+        thread = threading.Thread(target=lambda: exit_codes.append(run_watch(args)), daemon=True)
+        thread.start()
+        thread.join(10)
+        self.assertEqual(exit_codes, [2])
+        self.assertFalse(os.path.exists(self.output))
+
+    def test_workers_without_index_still_drain_queue(self):
+        for name in ('a.bmp', 'b.bmp', 'c.bmp'):
+            self.drop(name)
+        # A directory cannot be opened as a database, so every worker fails to connect
+        watcher = SpoolWatcher(self.spool, self.output, workers=2, queue_size=1, poll_interval=0.01,
+                               settle_time=0, index_path=self.directory)
+        self.run_once(watcher)
+
+        self.assertEqual(watcher.metrics.counters['failed'], 3)
+        with open(os.path.join(self.output, 'results', 'a.bmp.json')) as f:
+            self.assertEqual(json.load(f)['status'], 'error')
+
+    def test_stop_does_not_block_on_full_queue_with_dead_workers(self):
+        watcher = SpoolWatcher(self.spool, self.output, workers=1, queue_size=1)
+        dead = threading.Thread(target=lambda: None)
+        dead.start()
+        dead.join()
+        watcher.workers = [dead]
+        watcher.work_queue.put_nowait('queued.bmp')
+
+        stopper = threading.Thread(target=watcher.stop, daemon=True)
+        stopper.start()
+        stopper.join(5)
+        self.assertFalse(stopper.is_alive(), "stop() blocked on the full queue")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import os
+import random
+import struct
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import bmp_analyzer
+from bmp_analyzer import validate_bmp_header, BMP_OK
+
+ERROR_CODES = {value for name, value in vars(bmp_analyzer).items() if name.startswith('BMP_ERR_')}
+
+# Largest offset the validator may read: the BITMAPINFOHEADER ends at 14 + 40
+HEADER_LIMIT = 54
+
+
+def build_bmp(width=4, height=3, bits_per_pixel=24, compression=0, colors_used=0, image_size=None):
+    """Build a minimal BITMAPINFOHEADER file with zeroed pixel data"""
+    row_size = ((width * bits_per_pixel + 31) // 32) * 4
+    pixel_data_size = abs(height) * row_size if image_size is None else image_size
+    palette_size = 4 * colors_used
+    pixel_data_offset = 54 + palette_size
+
+    dib = struct.pack('<IiiHHIIiiII', 40, width, height, 1, bits_per_pixel, compression,
+                      pixel_data_size, 0, 0, colors_used, 0)
+    header = b'BM' + struct.pack('<IHHI', pixel_data_offset + pixel_data_size, 0, 0, pixel_data_offset)
+    return header + dib + bytes(palette_size) + bytes(pixel_data_size)
+
+
+class RecordingBytes(bytes):
+    """bytes that remembers the furthest offset read through indexing or slicing"""
+
+    def __new__(cls, data):
+        obj = super().__new__(cls, data)
+        obj.furthest = 0
+        return obj
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            stop = len(self) if key.stop is None else min(key.stop, len(self))
+        else:
+            stop = key + 1
+        self.furthest = max(self.furthest, stop)
+        return super().__getitem__(key)
+
+
+def fuzz_corpus(seed=2024, count=20000):
+    """Yield mutated, truncated and out-of-range header variants of valid files"""
+    rnd = random.Random(seed)
+    extremes = [0, 1, 0x7FFFFFFF, 0x80000000, 0xFFFFFFFF]
+
+    for _ in range(count):
+        data = bytearray(build_bmp(rnd.randint(1, 40), rnd.choice([-1, 1]) * rnd.randint(1, 40),
+                                   rnd.choice([1, 4, 8, 16, 24, 32])))
+        mutation = rnd.randrange(5)
+
+        if mutation == 0:
+            # Random byte flips inside the headers
+            for _ in range(rnd.randint(1, 6)):
+                data[rnd.randrange(HEADER_LIMIT)] = rnd.randrange(256)
+        elif mutation == 1:
+            data = data[:rnd.randrange(len(data) + 1)]
+        elif mutation == 2:
+            # Oversized or nonsensical dib_header_size
+            struct.pack_into('<I', data, 14, rnd.choice(extremes + [rnd.getrandbits(32)]))
+        elif mutation == 3:
+            # Extreme width/height, including values that overflow signed 32-bit math
+            struct.pack_into('<I', data, 18, rnd.choice(extremes + [rnd.getrandbits(32)]))
+            struct.pack_into('<I', data, 22, rnd.choice(extremes + [rnd.getrandbits(32)]))
+        else:
+            # Pixel offset, declared size and colors used pointing anywhere
+            struct.pack_into('<I', data, rnd.choice([2, 10, 46]), rnd.getrandbits(32))
+
+        yield bytes(data)
+
+
+class ValidateBmpHeaderTest(unittest.TestCase):
+    def test_valid_files_pass(self):
+        for bits_per_pixel in (1, 4, 8, 16, 24, 32):
+            for height in (3, -3):
+                data = build_bmp(5, height, bits_per_pixel)
+                self.assertEqual(validate_bmp_header(data), (BMP_OK, ""))
+
+    def test_core_header_passes(self):
+        dib = struct.pack('<IHHHH', 12, 2, 2, 1, 24)
+        data = b'BM' + struct.pack('<IHHI', 26 + 16, 0, 0, 26) + dib + bytes(16)
+        self.assertEqual(validate_bmp_header(data)[0], BMP_OK)
+
+    def test_compression_requires_matching_bit_depth(self):
+        self.assertEqual(validate_bmp_header(build_bmp(bits_per_pixel=24, compression=1, image_size=8))[0],
+                         bmp_analyzer.BMP_ERR_BIT_DEPTH)
+        self.assertEqual(validate_bmp_header(build_bmp(bits_per_pixel=8, compression=2, image_size=8))[0],
+                         bmp_analyzer.BMP_ERR_BIT_DEPTH)
+        self.assertEqual(validate_bmp_header(build_bmp(bits_per_pixel=24, compression=3))[0],
+                         bmp_analyzer.BMP_ERR_BIT_DEPTH)
+        self.assertEqual(validate_bmp_header(build_bmp(bits_per_pixel=8, compression=1, image_size=8))[0], BMP_OK)
+        self.assertEqual(validate_bmp_header(build_bmp(bits_per_pixel=4, compression=2, image_size=8))[0], BMP_OK)
+        self.assertEqual(validate_bmp_header(build_bmp(bits_per_pixel=32, compression=3))[0], BMP_OK)
+
+    def test_embedded_jpeg_ignores_palette_rule(self):
+        data = build_bmp(bits_per_pixel=0, compression=4, colors_used=5, image_size=16)
+        self.assertEqual(validate_bmp_header(data)[0], BMP_OK)
+
+    def test_fuzz_corpus_never_raises(self):
+        for data in fuzz_corpus():
+            code, message = validate_bmp_header(data)
+            self.assertIn(code, ERROR_CODES | {BMP_OK})
+            self.assertIsInstance(message, str)
+
+    def test_fuzz_corpus_reads_only_headers(self):
+        # Constant work: no input makes the validator look past the fixed-size headers
+        for data in fuzz_corpus(seed=7, count=5000):
+            recorded = RecordingBytes(data + bytes(4096))
+            validate_bmp_header(recorded)
+            self.assertLessEqual(recorded.furthest, HEADER_LIMIT)
+
+
+if __name__ == '__main__':
+    unittest.main()